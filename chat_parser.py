@@ -1,44 +1,138 @@
 # clone_a_friend/chat_parser.py
+import hashlib
+import json
+import mmap
+import os
 import re
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, List, Dict, Optional, Tuple
 
 # Regex to capture date, time, sender, and message
 # Handles both 12h (am/pm) and potentially 24h if am/pm is missing
-# Also handles multi-line messages
-MESSAGE_REGEX = re.compile(
-    r"(\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}\s*(?:[ap]\.?m\.?)?)\s*-\s*([^:]+):\s*(.*)",
-    re.IGNORECASE
+# Multiline/dotall so one finditer pass over the whole buffer captures each
+# message including its continuation lines, which run up to the next
+# timestamped line (the lookahead) or end of input.
+# When the third-party `regex` package is available, use it with possessive
+# quantifiers (*+, ++) so the scanner never backtracks through the
+# timestamp/sender prefix; otherwise fall back to the stdlib pattern.
+try:
+    import regex as _regex
+    MESSAGE_REGEX = _regex.compile(
+        r"^[ \t]*+(\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}\s*+(?:[ap]\.?m\.?)?)\s*+-\s*+(?P<sender>[^:\n]++):\s*"
+        r"(?P<msg>.*?)(?=^[ \t]*\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}|\Z)",
+        _regex.IGNORECASE | _regex.MULTILINE | _regex.DOTALL | _regex.V1
+    )
+except ImportError:
+    MESSAGE_REGEX = re.compile(
+        r"^[ \t]*(\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}\s*(?:[ap]\.?m\.?)?)\s*-\s*(?P<sender>[^:\n]+):\s*"
+        r"(?P<msg>.*?)(?=^[ \t]*\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}|\Z)",
+        re.IGNORECASE | re.MULTILINE | re.DOTALL
+    )
+
+# Bytes twin of MESSAGE_REGEX for scanning memory-mapped files without
+# decoding the whole export upfront. In bytes mode \s only covers ASCII
+# whitespace, so the UTF-8 sequences for NBSP (\xc2\xa0) and the narrow
+# NBSP WhatsApp puts before am/pm (\xe2\x80\xaf) are spelled out.
+_BSPACE = rb"(?:\s|\xc2\xa0|\xe2\x80\xaf)"
+MESSAGE_REGEX_BYTES = re.compile(
+    rb"^[ \t]*(\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}" + _BSPACE + rb"*(?:[ap]\.?m\.?)?)"
+    + _BSPACE + rb"*-" + _BSPACE + rb"*(?P<sender>[^:\n]+):\s*"
+    rb"(?P<msg>.*?)(?=^[ \t]*\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}|\Z)",
+    re.IGNORECASE | re.MULTILINE | re.DOTALL
 )
 
-# System messages to ignore
-SYSTEM_MESSAGE_PATTERNS = [
-    re.compile(r".*Messages and calls are end-to-end encrypted.*"),
-    re.compile(r".*is a contact.*"),
-    re.compile(r".*created group.*"),
-    re.compile(r".*added.*"),
-    re.compile(r".*left.*"),
-    re.compile(r".*changed this group's icon.*"),
-    re.compile(r".*changed the subject.*"),
-    re.compile(r".*You're now an admin.*"),
-]
-
-def is_system_message(line: str) -> bool:
-    """Checks if a line is a system message."""
-    # First, check if it matches the standard message format. If it does, it's not a system message.
-    if MESSAGE_REGEX.match(line):
-        # Check for specific content often found in non-message lines but formatted like messages
-        parts = MESSAGE_REGEX.match(line)
-        if parts:
-            content = parts.group(3).strip().lower()
-            if content == "null" or content == "<media omitted>" or "<this message was edited>" in content:
-                return True # Treat these as ignorable system-like messages
-
-    # Check against explicit system message patterns for lines that DON'T match message format
-    if not MESSAGE_REGEX.match(line): # Only apply these patterns if it's not a regular message
-        for pattern in SYSTEM_MESSAGE_PATTERNS:
-            if pattern.match(line):
-                return True
-    return False
+# Optional Hyperscan acceleration: a SIMD multi-pattern DFA that locates
+# message starts at line rate. Hyperscan has no capture groups, so the
+# scanner only reports start offsets and a cheap byte-level colon-find
+# splits sender from body.
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+_HYPERSCAN_DB = None
+
+def _get_hyperscan_db():
+    """Compiles the message-start database once per process."""
+    global _HYPERSCAN_DB
+    if _HYPERSCAN_DB is None:
+        _HYPERSCAN_DB = hyperscan.Database()
+        _HYPERSCAN_DB.compile(
+            expressions=[rb"^[ \t]*\d{2}/\d{2}/\d{2}, \d{1,2}:\d{2}"],
+            ids=[0],
+            elements=1,
+            flags=[hyperscan.HS_FLAG_MULTILINE | hyperscan.HS_FLAG_SOM_LEFTMOST],
+        )
+    return _HYPERSCAN_DB
+
+def _iter_matches_hyperscan(chat_content: str) -> Iterable[Tuple[str, str]]:
+    """
+    Yields (sender, raw body) pairs using Hyperscan to find timestamped
+    line starts. Records without a "sender:" prefix on their first line
+    (system notices) are skipped, matching the regex scanner's behaviour.
+    """
+    data = chat_content.encode("utf-8")
+    starts: List[int] = []
+
+    def on_match(pattern_id, start, end, flags, context=None):
+        # The pattern is line-anchored, so duplicate events for one line
+        # share the same start offset; keep each line once.
+        if not starts or starts[-1] != start:
+            starts.append(start)
+
+    _get_hyperscan_db().scan(data, match_event_handler=on_match)
+    starts.append(len(data))
+
+    for i in range(len(starts) - 1):
+        record = data[starts[i]:starts[i + 1]]
+        dash = record.find(b" - ")
+        if dash == -1:
+            continue
+        rest = record[dash + 3:]
+        colon = rest.find(b":")
+        newline = rest.find(b"\n")
+        if colon == -1 or (newline != -1 and colon > newline):
+            continue  # no sender on the first line: a system notice
+        yield rest[:colon].decode("utf-8"), rest[colon + 1:].decode("utf-8")
+
+# Optional NumPy/Numba acceleration for the post-scan sender filter.
+# Fixed-width bytes arrays would truncate long message bodies, so senders
+# are interned to small integer ids; with NumPy alone the ids are masked
+# with vectorized boolean indexing, and with Numba on top a jitted kernel
+# selects the matching indices directly. The message strings themselves
+# are never copied into fixed-width NumPy storage.
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    _select_indices = None
+
+if np is not None:
+    try:
+        from numba import njit
+
+        @njit(cache=True)
+        def _select_indices(ids, target_id):
+            out = np.empty(ids.shape[0], dtype=np.int64)
+            n = 0
+            for i in range(ids.shape[0]):
+                if ids[i] == target_id:
+                    out[n] = i
+                    n += 1
+            return out[:n]
+
+        # Trivial call at import time so JIT compilation happens once upfront
+        # instead of on the first real parse.
+        _select_indices(np.zeros(1, dtype=np.int32), 0)
+    except ImportError:
+        _select_indices = None
+
+# Collapses newlines and whitespace runs in multi-line bodies in one C-level pass
+_MULTISPACE = re.compile(r"\s+")
+
+# Message contents that carry no text worth keeping (exports use these as
+# placeholders). Compiled once at module level so the check is a single
+# C-level scan with no per-call pattern-cache lookup.
+_IGNORE_CONTENT_RE = re.compile(r"^(?:null|<media omitted>)?\s*$", re.IGNORECASE)
 
 def clean_message_text(text: str) -> str:
     """Cleans known artifacts from message text."""
@@ -46,77 +140,149 @@ def clean_message_text(text: str) -> str:
     # Add any other cleaning rules if needed
     return text
 
-def parse_chat_file_from_string(chat_content: str, target_friend_name: str) -> Tuple[List[str], Optional[str]]:
+def _collect_into(senders: List[str], messages: List[str],
+                  sender_msg_pairs: Iterable[Tuple[str, str]]) -> None:
     """
-    Parses chat content from a string to extract messages from the target friend
-    and identify the other main participant (the user).
-    This version is for testing with string input directly.
+    Appends cleaned (sender, message) rows from raw scanner output onto the
+    given parallel lists, skipping placeholder contents.
     """
-    friend_messages: List[str] = []
-    all_senders = set()
-    parsed_messages: List[Dict[str, str]] = []
-    current_message_sender = None
-    current_message_content = []
-
-    for line in chat_content.splitlines():
-        line = line.strip()
-        if not line:
+    for raw_sender, raw_msg in sender_msg_pairs:
+        # Fold multi-line bodies into one line with a single substitution
+        # rather than splitting, stripping, and re-joining line by line.
+        content = _MULTISPACE.sub(" ", raw_msg).strip()
+        if _IGNORE_CONTENT_RE.match(content):
+            continue  # placeholder content (null / media / empty), skip entirely
+        cleaned_message = clean_message_text(content)
+        if not cleaned_message:
             continue
+        senders.append(raw_sender.strip())
+        messages.append(cleaned_message)
 
-        if is_system_message(line):
-            if current_message_sender and current_message_content:
-                full_message = " ".join(current_message_content)
-                cleaned_message = clean_message_text(full_message)
-                if cleaned_message:
-                    parsed_messages.append({"sender": current_message_sender, "message": cleaned_message})
-                current_message_sender = None
-                current_message_content = []
-            continue
 
-        match = MESSAGE_REGEX.match(line)
-        if match:
-            if current_message_sender and current_message_content:
-                full_message = " ".join(current_message_content)
-                cleaned_message = clean_message_text(full_message)
-                if cleaned_message:
-                    parsed_messages.append({"sender": current_message_sender, "message": cleaned_message})
-            
-            _, sender, message_part = match.groups()
-            sender = sender.strip()
-            current_message_sender = sender
-            current_message_content = [message_part.strip()]
-            all_senders.add(sender)
-        elif current_message_sender:
-            current_message_content.append(line.strip())
-    
-    if current_message_sender and current_message_content:
-        full_message = " ".join(current_message_content)
-        cleaned_message = clean_message_text(full_message)
-        if cleaned_message:
-            parsed_messages.append({"sender": current_message_sender, "message": cleaned_message})
-
-    for msg_data in parsed_messages:
-        if msg_data["sender"].lower() == target_friend_name.lower():
-            friend_messages.append(msg_data["message"])
-    
-    other_senders = [s for s in all_senders if s.lower() != target_friend_name.lower()]
+def _filter_messages(senders: List[str], messages: List[str],
+                     target_friend_name: str) -> Tuple[List[str], Optional[str]]:
+    """
+    Shared tail of parsing: picks the target friend's messages out of the
+    parallel sender/message lists and infers the chat partner.
+    """
+    # Memoizes str.lower() per distinct sender (group chats repeat the same
+    # few sender strings thousands of times). Insertion-ordered, so it also
+    # doubles as the first-seen sender registry.
+    sender_keys: Dict[str, str] = {}
+    for s in senders:
+        if s not in sender_keys:
+            sender_keys[s] = s.lower()
+
+    target = target_friend_name.lower()
+    if np is not None and senders:
+        # Intern each distinct (lowercased) sender to an integer id, then
+        # select rows with the jitted kernel when Numba is present or a
+        # vectorized boolean mask when only NumPy is.
+        key_ids: Dict[str, int] = {}
+        for lowered in sender_keys.values():
+            if lowered not in key_ids:
+                key_ids[lowered] = len(key_ids)
+        ids = np.fromiter((key_ids[sender_keys[s]] for s in senders),
+                          dtype=np.int32, count=len(senders))
+        target_id = key_ids.get(target, -1)
+        if _select_indices is not None:
+            selected = _select_indices(ids, target_id)
+            friend_messages = [messages[i] for i in selected]
+        else:
+            mask = ids == target_id
+            friend_messages = np.array(messages, dtype=object)[mask].tolist()
+    else:
+        friend_messages = [m for s, m in zip(senders, messages) if sender_keys[s] == target]
+
+    other_senders = [s for s in sender_keys if sender_keys[s] != target]
     user_name = other_senders[0] if other_senders else None
-    
+
     if not friend_messages:
-        print(f"Warning (from string parse): No messages found for '{target_friend_name}'.")
+        print(f"Warning: No messages found for '{target_friend_name}'.")
 
     return friend_messages, user_name
 
 
+def _extract_messages(sender_msg_pairs: Iterable[Tuple[str, str]],
+                      target_friend_name: str) -> Tuple[List[str], Optional[str]]:
+    """Collects scanner output into parallel lists and filters in one step."""
+    # Parallel lists (struct-of-arrays) instead of a list of per-message
+    # dicts: far less memory per message and a cache-friendly final filter.
+    senders: List[str] = []
+    messages: List[str] = []
+    _collect_into(senders, messages, sender_msg_pairs)
+    return _filter_messages(senders, messages, target_friend_name)
+
+
+def parse_chat_file_from_string(chat_content: str, target_friend_name: str) -> Tuple[List[str], Optional[str]]:
+    """
+    Parses chat content from a string to extract messages from the target friend
+    and identify the other main participant (the user).
+    This version is for testing with string input directly.
+    """
+    # One scanner invocation covers the whole buffer; each match already
+    # spans a full message including its continuation lines, so no Python-level
+    # line loop or accumulator is needed. Timestamped lines without a
+    # "sender:" prefix (the system messages) simply never match.
+    if hyperscan is not None:
+        pairs = _iter_matches_hyperscan(chat_content)
+    else:
+        pairs = ((m["sender"], m["msg"]) for m in MESSAGE_REGEX.finditer(chat_content))
+    return _extract_messages(pairs, target_friend_name)
+
+
+# On-disk cache of parsed sender/message arrays so re-running the CLI on
+# the same export (or one that has only grown, e.g. a refreshed export of
+# the same chat) skips re-reading and re-scanning the unchanged prefix.
+# Entries are keyed by absolute path and carry mtime/size plus a hash of
+# the file's first bytes to detect regenerated (not appended) files.
+_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".clone_a_friend")
+_CACHE_PATH = os.path.join(_CACHE_DIR, "cache.json")
+_HEAD_HASH_BYTES = 4096
+
+def _head_hash(f) -> str:
+    """Hash of the file's leading bytes; changes when the file is rewritten."""
+    pos = f.tell()
+    f.seek(0)
+    digest = hashlib.md5(f.read(_HEAD_HASH_BYTES)).hexdigest()
+    f.seek(pos)
+    return digest
+
+def _load_cache_entry(filepath: str) -> Optional[Dict]:
+    try:
+        with open(_CACHE_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f).get(os.path.abspath(filepath))
+    except (OSError, ValueError):
+        return None
+
+def _save_cache_entry(filepath: str, entry: Dict) -> None:
+    # Best effort: a failed cache write should never break parsing.
+    try:
+        try:
+            with open(_CACHE_PATH, 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            cache = {}
+        cache[os.path.abspath(filepath)] = entry
+        os.makedirs(_CACHE_DIR, exist_ok=True)
+        with open(_CACHE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(cache, f)
+    except OSError:
+        pass
+
+
 def parse_chat_file(filepath: str, target_friend_name: str) -> Tuple[List[str], Optional[str]]:
     """
     Parses the chat file to extract messages from the target friend
     and identify the other main participant (the user).
+    The file is memory-mapped and scanned as bytes, so only the captured
+    sender/message slices are ever decoded — no full-file decode or copy.
+    Parsed arrays are cached under ~/.clone_a_friend/ keyed by file
+    identity; an unchanged file is served from cache and a grown file is
+    re-scanned only from the start of its previously-last message.
     """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            chat_content = f.read()
-        return parse_chat_file_from_string(chat_content, target_friend_name)
+        st = os.stat(filepath)
     except FileNotFoundError:
         print(f"Error: Chat file not found at {filepath}")
         return [], None
@@ -124,6 +290,72 @@ def parse_chat_file(filepath: str, target_friend_name: str) -> Tuple[List[str],
         print(f"Error parsing chat file: {e}")
         return [], None
 
+    entry = _load_cache_entry(filepath)
+    if (entry is not None and entry.get("mtime") == st.st_mtime
+            and entry.get("size") == st.st_size):
+        return _filter_messages(entry["senders"], entry["messages"], target_friend_name)
+
+    senders: List[str] = []
+    messages: List[str] = []
+    try:
+        with open(filepath, 'rb') as f:
+            # Resume from the start of the previously-last message when the
+            # file has only grown and its head is unchanged (appended export);
+            # that message may have gained continuation lines, so it is
+            # excluded from the cached rows ("cut") and re-parsed here.
+            resume = 0
+            if (entry is not None and st.st_size > entry.get("size", 0)
+                    and entry.get("offset") is not None
+                    and _head_hash(f) == entry.get("head_hash")):
+                resume = entry["offset"]
+                senders = entry["senders"][:entry["cut"]]
+                messages = entry["messages"][:entry["cut"]]
+
+            if resume:
+                f.seek(resume)
+                buf: bytes = f.read()
+            else:
+                senders = []
+                messages = []
+                try:
+                    buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    buf = b""  # empty files cannot be mapped
+
+            last_start = None
+            cut = len(messages)
+            matches = list(MESSAGE_REGEX_BYTES.finditer(buf))
+            if matches:
+                head_pairs = ((m["sender"].decode("utf-8"), m["msg"].decode("utf-8"))
+                              for m in matches[:-1])
+                _collect_into(senders, messages, head_pairs)
+                cut = len(messages)
+                last = matches[-1]
+                last_start = resume + last.start()
+                _collect_into(senders, messages,
+                              ((last["sender"].decode("utf-8"), last["msg"].decode("utf-8")),))
+            elif entry is not None and resume:
+                last_start = entry.get("offset")
+                cut = entry.get("cut", len(messages))
+
+            head_digest = _head_hash(f)
+            if isinstance(buf, mmap.mmap):
+                buf.close()
+    except Exception as e:
+        print(f"Error parsing chat file: {e}")
+        return [], None
+
+    _save_cache_entry(filepath, {
+        "mtime": st.st_mtime,
+        "size": st.st_size,
+        "head_hash": head_digest,
+        "offset": last_start,
+        "cut": cut,
+        "senders": senders,
+        "messages": messages,
+    })
+    return _filter_messages(senders, messages, target_friend_name)
+
 
 if __name__ == '__main__':
     # Dummy chat content for self-testing the parser logic
@@ -1,6 +1,8 @@
 import os
+import threading
+import httpx
 from groq import Groq, GroqError
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional
 
 # Model to use. You can try different Llama3 versions available on Groq.
 # e.g., "llama3-8b-8192", "llama3-70b-8192"
@@ -8,19 +10,113 @@ LLM_MODEL = "llama3-8b-8192"
 MAX_EXAMPLE_MESSAGES = 15 # Number of friend's example messages to include in prompt
 MAX_CONVERSATION_TOKENS = 4096 # Max tokens for conversation history to keep it manageable
 
+# System-prompt templates, built once at module level and filled with a
+# single format_map call. The prefix is invariant per session (and cached);
+# the turn template is the only part formatted on every call.
+PROMPT_PREFIX_TEMPLATE = (
+    "You are {friend_name}. You are talking to {user_name}."
+    " Your goal is to impersonate {friend_name} as accurately as possible, mimicking their"
+    " texting style, tone, common phrases, emoji usage, and typical response length based on"
+    " the following examples of their past messages."
+    " Do not explicitly state you are an AI or a clone. Respond naturally as if you are {friend_name}.\n\n"
+    "Here are some examples of how {friend_name} texts:\n{examples}"
+)
+PROMPT_TURN_TEMPLATE = (
+    "\nNow, continue the conversation. You are {friend_name}."
+    " The user ({user_name}) has just said: \"{user_message}\"."
+    "\nOnly output {friend_name}'s response. Do not add any prefixes like '{friend_name}: '."
+)
+
+# One Groq client per API key, shared across LLMHandler instances: client
+# construction sets up an httpx connection pool and TLS context, which
+# would dominate if handlers were ever created per request.
+_CLIENTS: Dict[str, Groq] = {}
+_CLIENTS_LOCK = threading.Lock()
+
+def _get_client(api_key: str) -> Groq:
+    with _CLIENTS_LOCK:
+        client = _CLIENTS.get(api_key)
+        if client is None:
+            try:
+                # HTTP/2 multiplexes calls over one connection and compresses
+                # headers; falls back cleanly when the h2 extra is missing.
+                client = Groq(api_key=api_key, http_client=httpx.Client(http2=True))
+            except ImportError:
+                client = Groq(api_key=api_key)
+            _CLIENTS[api_key] = client
+        return client
+
+
+def _pick_candidate(candidates: List[str], style_examples: List[str]) -> str:
+    """
+    Picks the candidate whose length is closest to the median length of the
+    friend's example messages — a cheap proxy for matching their typical
+    response length.
+    """
+    if not style_examples:
+        return candidates[0]
+    lengths = sorted(len(example) for example in style_examples)
+    median_length = lengths[len(lengths) // 2]
+    return min(candidates, key=lambda c: abs(len(c) - median_length))
+
+
 class LLMHandler:
     def __init__(self, api_key: str):
         if not api_key:
             raise ValueError("Groq API key not provided.")
-        self.client = Groq(api_key=api_key)
+        self.client = _get_client(api_key)
         self.model = LLM_MODEL
+        # Caches the invariant system-prompt prefix (persona + style examples)
+        # per (friend, user, examples) session so it is built only once, not
+        # re-assembled on every turn.
+        self._prefix_cache: Dict[tuple, str] = {}
+
+    def _session_prefix(self, friend_name: str, user_name: Optional[str],
+                        friend_style_examples: List[str]) -> str:
+        """Builds (or returns the cached) invariant system-prompt prefix."""
+        cache_key = (friend_name, user_name, id(friend_style_examples))
+        prefix = self._prefix_cache.get(cache_key)
+        if prefix is None:
+            # Use a subset of examples, ensuring not to make the prompt too long
+            examples_to_use = friend_style_examples[-MAX_EXAMPLE_MESSAGES:]
+            examples_block = "".join(f"- \"{example}\"\n" for example in examples_to_use)
+            prefix = PROMPT_PREFIX_TEMPLATE.format_map({
+                "friend_name": friend_name,
+                "user_name": user_name if user_name else "your friend",
+                "examples": examples_block,
+            })
+            self._prefix_cache[cache_key] = prefix
+        return prefix
+
+    def warm_cache(self, friend_name: str, user_name: Optional[str],
+                   friend_style_examples: List[str]) -> None:
+        """
+        Fire-and-forget prompt prefill warmup: submits the session's
+        invariant prefix with max_tokens=1 on a background thread so the
+        provider's prompt cache is hot while the user is still typing.
+        Failures are ignored — warmup is purely opportunistic.
+        """
+        prefix = self._session_prefix(friend_name, user_name, friend_style_examples)
+
+        def _warm():
+            try:
+                self.client.chat.completions.create(
+                    messages=[{"role": "system", "content": prefix}],
+                    model=self.model,
+                    max_tokens=1,
+                    temperature=0.0,
+                )
+            except Exception:
+                pass
+
+        threading.Thread(target=_warm, daemon=True).start()
 
     def generate_response(self, friend_name: str, user_name: Optional[str],
                           friend_style_examples: List[str],
-                          conversation_history: List[Dict[str, str]],
-                          user_message: str) -> Optional[str]:
+                          conversation_history: Iterable[Dict[str, str]],
+                          user_message: str, n: int = 1) -> Iterator[str]:
         """
-        Generates a response from the LLM emulating the friend.
+        Generates a streamed response from the LLM emulating the friend.
 
         Args:
             friend_name (str): The name of the friend being cloned.
@@ -28,77 +124,75 @@ class LLMHandler:
             friend_style_examples (List[str]): A list of messages from the friend for style guidance.
             conversation_history (List[Dict[str,str]]): Current chat history [{'role': 'user'/'assistant', 'content': ...}].
             user_message (str): The latest message from the user.
+            n (int): Number of candidates to sample. With n > 1 all candidates
+                come back in one round-trip (prompt prefill paid once), the
+                best match for the friend's typical message length is picked,
+                and streaming is skipped since candidates can't be streamed.
 
-        Returns:
-            Optional[str]: The LLM's generated response, or None if an error occurs.
+        Yields:
+            str: Pieces of the LLM's response as they stream in, so the first
+            words appear without waiting for the full completion. Yields
+            nothing if an error occurs.
         """
         
-        # Construct the system prompt
-        system_prompt_content = f"You are {friend_name}. You are talking to {user_name if user_name else 'your friend'}."
-        system_prompt_content += " Your goal is to impersonate {friend_name} as accurately as possible, mimicking their texting style, tone, common phrases, emoji usage, and typical response length based on the following examples of their past messages."
-        system_prompt_content += " Do not explicitly state you are an AI or a clone. Respond naturally as if you are {friend_name}.\n\n"
-        system_prompt_content += "Here are some examples of how {friend_name} texts:\n"
-
-        # Add examples, ensuring not to make the prompt too long
-        # Using a subset of examples
-        examples_to_use = friend_style_examples[-MAX_EXAMPLE_MESSAGES:]
-        for i, example in enumerate(examples_to_use):
-            system_prompt_content += f"- \"{example}\"\n"
-        
-        system_prompt_content += f"\nNow, continue the conversation. You are {friend_name}. The user ({user_name if user_name else 'your friend'}) has just said: \"{user_message}\"."
-        system_prompt_content += f"\nOnly output {friend_name}'s response. Do not add any prefixes like '{friend_name}: '."
-
+        # Construct the system prompt. The prefix (persona + examples) is
+        # identical for every turn of a session, so format it once and cache.
+        display_user = user_name if user_name else "your friend"
+        prefix = self._session_prefix(friend_name, user_name, friend_style_examples)
 
-        messages_for_api = [
-            {"role": "system", "content": system_prompt_content}
-        ]
+        system_prompt_content = prefix + PROMPT_TURN_TEMPLATE.format_map({
+            "friend_name": friend_name,
+            "user_name": display_user,
+            "user_message": user_message,
+        })
 
-        # Add recent conversation history (ensure it doesn't get too long)
-        # A simple way is to take the last N turns. More sophisticated methods could count tokens.
-        # For now, let's keep it simple. The system prompt contains most context.
-        # The Groq API expects 'user' and 'assistant' roles.
-        # Our 'conversation_history' is already in this format.
-
-        # Add existing conversation history
-        # The prompt is structured so the latest user message is part of the system prompt's instruction,
-        # but for API consistency, it's better to pass full history.
-        
-        # Build the message list for the API
-        # System prompt first
-        api_messages = [{"role": "system", "content": system_prompt_content}]
-        
-        # Add conversation history (user prompts and assistant responses)
-        # The 'user' in conversation_history is the actual human user.
-        # The 'assistant' is the clone.
-        for chat_turn in conversation_history:
-            api_messages.append(chat_turn)
-        
-        # Add the current user's message
-        api_messages.append({"role": "user", "content": user_message})
 
+        # Build the message list for the API in one go: system prompt first,
+        # then the conversation history ('user' is the human, 'assistant' is
+        # the clone — already in Groq's expected format), then the current
+        # user message.
+        api_messages = [
+            {"role": "system", "content": system_prompt_content},
+            *conversation_history,
+            {"role": "user", "content": user_message},
+        ]
 
         try:
             # print("\n--- Sending to Groq API ---")
             # print(f"System Prompt: {system_prompt_content[:500]}...") # Print start of system prompt
             # print(f"Last few messages for API: {api_messages[-3:]}")  # Print last few actual messages sent
-            
-            chat_completion = self.client.chat.completions.create(
-                messages=api_messages,
-                model=self.model,
-                temperature=0.7, # Adjust for creativity vs. predictability
-                max_tokens=150,   # Max length of the generated response
-            )
-            response = chat_completion.choices[0].message.content.strip()
-            # print(f"Raw LLM Response: '{response}'") # Debugging
-            return response
+
+            if n > 1:
+                chat_completion = self.client.chat.completions.create(
+                    messages=api_messages,
+                    model=self.model,
+                    temperature=0.7, # Adjust for creativity vs. predictability
+                    max_tokens=150,   # Max length of the generated response
+                    n=n,              # All candidates share one prompt prefill
+                )
+                candidates = [choice.message.content.strip()
+                              for choice in chat_completion.choices]
+                candidates = [c for c in candidates if c]
+                if candidates:
+                    yield _pick_candidate(candidates, friend_style_examples)
+            else:
+                stream = self.client.chat.completions.create(
+                    messages=api_messages,
+                    model=self.model,
+                    temperature=0.7, # Adjust for creativity vs. predictability
+                    max_tokens=150,   # Max length of the generated response
+                    stream=True,      # Yield pieces as they arrive instead of blocking
+                )
+                for chunk in stream:
+                    piece = chunk.choices[0].delta.content
+                    if piece:
+                        yield piece
         except GroqError as e:
             print(f"Groq API Error: {e}")
             if "context_length_exceeded" in str(e).lower():
                 print("Context length exceeded. Try reducing MAX_EXAMPLE_MESSAGES or a shorter chat history.")
-            return None
         except Exception as e:
             print(f"An unexpected error occurred with the LLM: {e}")
-            return None
 
 if __name__ == '__main__':
     # This is a simple test. Requires .env to be set up.
@@ -131,14 +225,14 @@ if __name__ == '__main__':
         print(f"\n--- Testing LLMHandler for {test_friend_name} talking to {test_user_name} ---")
         print(f"{test_user_name} (User): {test_user_message}")
         
-        response = handler.generate_response(
+        response = "".join(handler.generate_response(
             friend_name=test_friend_name,
             user_name=test_user_name,
             friend_style_examples=test_friend_examples,
             conversation_history=test_conversation_history,
             user_message=test_user_message
-        )
-        
+        )).strip()
+
         if response:
             print(f"{test_friend_name} (Clone): {response}")
         else:
@@ -1,11 +1,48 @@
+import io
 import os
+import sys
+from collections import deque
 from dotenv import load_dotenv
 from chat_parser import parse_chat_file
-from llm_handler import LLMHandler, MAX_EXAMPLE_MESSAGES
+from llm_handler import LLMHandler, MAX_EXAMPLE_MESSAGES, MAX_CONVERSATION_TOKENS
 
 # Max turns to keep in conversation history for the LLM (each turn is user + assistant)
 MAX_CONVERSATION_HISTORY_TURNS = 10
 
+# Token counting for history trimming: use tiktoken's encoder when installed,
+# otherwise fall back to a rough chars-per-token estimate. Counts are kept
+# incrementally per message so trimming never re-tokenizes the whole history.
+# The encoder is created lazily on first use because get_encoding() fetches
+# the BPE file over the network when its cache is cold; any failure there
+# (tiktoken missing, offline, proxy) degrades to the estimate instead of
+# crashing at import.
+_ENCODER = None  # None = not tried yet, False = unavailable, else the encoder
+
+def count_tokens(text: str) -> int:
+    global _ENCODER
+    if _ENCODER is None:
+        try:
+            import tiktoken
+            _ENCODER = tiktoken.get_encoding("cl100k_base")
+        except Exception:
+            _ENCODER = False
+    if _ENCODER:
+        return len(_ENCODER.encode(text))
+    return len(text) // 4 + 1  # ~4 chars per token for English text
+
+# Nicer line editing (history, cursor movement) when prompt_toolkit is
+# installed and we're on a real terminal; plain input() otherwise.
+try:
+    from prompt_toolkit import PromptSession
+except ImportError:
+    PromptSession = None
+
+def make_input_reader():
+    if PromptSession is not None and sys.stdin.isatty():
+        session = PromptSession()
+        return session.prompt
+    return input
+
 def main():
     load_dotenv()
     groq_api_key = os.getenv("GROQ_API_KEY")
@@ -17,14 +54,15 @@ def main():
         return
 
     print("Welcome to Clone-A-Friend!")
+    read_input = make_input_reader()
 
     while True:
-        chat_file_path = input("Enter the path to the exported chat text file: ").strip()
+        chat_file_path = read_input("Enter the path to the exported chat text file: ").strip()
         if os.path.exists(chat_file_path):
             break
         print(f"File not found: {chat_file_path}. Please try again.")
 
-    friend_name_to_clone = input("Enter the exact name of the friend you want to clone (as it appears in the chat file): ").strip()
+    friend_name_to_clone = read_input("Enter the exact name of the friend you want to clone (as it appears in the chat file): ").strip()
 
     print(f"\nParsing chat history for {friend_name_to_clone}'s messages...")
     friend_messages, chat_partner_name = parse_chat_file(chat_file_path, friend_name_to_clone)
@@ -48,15 +86,21 @@ def main():
 
     llm = LLMHandler(api_key=groq_api_key)
 
+    # Warm the provider's prompt cache with the invariant prefix while the
+    # user reads the banner and types their first message
+    llm.warm_cache(friend_name_to_clone, chat_partner_name, friend_style_examples)
+
     print(f"\n--- Chatting with Clone of {friend_name_to_clone} ---")
     print(f"You are now chatting with a digital clone of {friend_name_to_clone}.")
     print(f"The clone's persona is based on their chat history with {chat_partner_name}.")
     print("Type 'quit' or 'exit' to end the chat.")
 
-    conversation_history_for_llm = [] # Stores {"role": "user", "content": ...} or {"role": "assistant", "content": ...}
+    conversation_history_for_llm = deque() # Stores {"role": "user", "content": ...} or {"role": "assistant", "content": ...}
+    history_token_counts = deque() # Parallel per-message token counts for O(1) trimming
+    history_tokens = 0
 
     while True:
-        user_input = input(f"{chat_partner_name} (User): ") # <--- CORRECTED LINE
+        user_input = read_input(f"{chat_partner_name} (User): ")
         if user_input.lower() in ['quit', 'exit']:
             print("Exiting chat. Goodbye!")
             break
@@ -70,28 +114,46 @@ def main():
         # current_turn_for_llm_history = [{"role": "user", "content": user_input}]
 
 
-        print(f"{friend_name_to_clone} (Clone): Thinking...") # Placeholder while waiting
-
-        clone_response = llm.generate_response(
+        # Stream the reply as it is generated so the first words appear
+        # immediately instead of blocking on the full completion
+        print(f"{friend_name_to_clone} (Clone): ", end="", flush=True)
+        response_buffer = io.StringIO()
+        for piece in llm.generate_response(
             friend_name=friend_name_to_clone,
             user_name=chat_partner_name,
             friend_style_examples=friend_style_examples,
             conversation_history=conversation_history_for_llm, # Pass the history so far
             user_message=user_input
-        )
+        ):
+            sys.stdout.write(piece)
+            sys.stdout.flush()
+            response_buffer.write(piece)
+        print()
+        clone_response = response_buffer.getvalue().strip()
 
         if clone_response:
-            print(f"\r{friend_name_to_clone} (Clone): {clone_response}") # \r to overwrite "Thinking..."
-            # Add user message and assistant response to history
-            conversation_history_for_llm.append({"role": "user", "content": user_input})
-            conversation_history_for_llm.append({"role": "assistant", "content": clone_response})
-
-            # Trim conversation history to prevent it from growing too large
-            if len(conversation_history_for_llm) > MAX_CONVERSATION_HISTORY_TURNS * 2: # *2 for user+assistant
-                # Keep only the last MAX_CONVERSATION_HISTORY_TURNS
-                conversation_history_for_llm = conversation_history_for_llm[-(MAX_CONVERSATION_HISTORY_TURNS * 2):]
+            # Add user message and assistant response to history, tracking
+            # each message's token count as it is appended
+            for role, content in (("user", user_input), ("assistant", clone_response)):
+                conversation_history_for_llm.append({"role": role, "content": content})
+                tokens = count_tokens(content)
+                history_token_counts.append(tokens)
+                history_tokens += tokens
+
+            # Trim conversation history to prevent it from growing too large:
+            # evict oldest messages while over the token budget or the turn
+            # cap (*2 for user+assistant). Not a maxlen deque — auto-eviction
+            # would silently desync the token ledger.
+            while (history_tokens > MAX_CONVERSATION_TOKENS
+                   or len(conversation_history_for_llm) > MAX_CONVERSATION_HISTORY_TURNS * 2):
+                history_tokens -= history_token_counts.popleft()
+                conversation_history_for_llm.popleft()
+
+            # Re-warm the prompt cache in the background while the user
+            # types their next message
+            llm.warm_cache(friend_name_to_clone, chat_partner_name, friend_style_examples)
         else:
-            print(f"\r{friend_name_to_clone} (Clone): Sorry, I couldn't generate a response right now.")
+            print(f"{friend_name_to_clone} (Clone): Sorry, I couldn't generate a response right now.")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file